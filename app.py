@@ -1,181 +1,477 @@
 # app.py
+import atexit
 import time
+import concurrent.futures
 import threading
+import collections
+import os
 import sqlite3
-import datetime
 import smtplib
 from email.mime.text import MIMEText
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
 import smbus
-from influxdb import InfluxDBClient
 from twilio.rest import Client
-from flask import Flask, jsonify, render_template
+from twilio.http.http_client import TwilioHttpClient
+from flask import Flask, Response, jsonify, render_template
+from flask.json.provider import JSONProvider
+
+try:
+    # Optional C parser, built with: cythonize -i sensor_parse.pyx
+    from sensor_parse import parse as parse_fast
+except ImportError:
+    parse_fast = None
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # -------------------------------
 # Global Variables and Constants
 # -------------------------------
 SLAVE_ADDR = 4                 # I²C address for the Arduino slave
 I2C_BUS   = 1                 # Most Raspberry Pis use bus 1
+I2C_CHUNK = 32                 # Bytes per I²C block read (the SMBus block limit)
+MAX_MESSAGE_LEN = 64           # Longest sensor message the Uno sends
 global_sensor_data = {}        # Latest sensor reading dictionary
+global_sensor_json = b"{}"     # Latest sensor reading, serialized for /api/data
 last_alert_time = 0            # For rate-limiting alerts (in seconds)
+_last_alerted_status = 0       # Status last reported by an alert (reset to 0 once the sensor recovers)
 ALERT_RATE_LIMIT = 300         # 5 minutes
+ALERT_TIMEOUT = 5              # Seconds before an alert request is abandoned
 
 
 # -------------------------------
 # I²C Sensor Reading Functions
 # -------------------------------
+def open_bus():
+    """Open the I²C bus. Returns None if the device is not available."""
+    try:
+        return smbus.SMBus(I2C_BUS)
+    except Exception as e:
+        print("I2C bus open error:", e)
+        return None
+
+
+# I²C bus handle, opened once and reused for every poll
+_bus = open_bus()
+
+
 def read_sensor_data():
     """
     Read raw data from the Uno over I²C.
-    The sensor message is expected to be a string of up to 64 bytes.
+    The sensor message is expected to be up to 64 bytes and is returned as bytes.
+    Reads one 32-byte chunk and only reads further chunks until the closing '$'
+    has been received.
+
+    Firmware contract: an SMBus block read returns at most 32 bytes, so the Uno
+    must treat the command (register) byte as a byte offset into its current
+    message -- register 0 returns bytes 0-31, register 32 returns bytes 32-63 --
+    and pad past the end of the message with nulls.
     """
+    global _bus
+    if _bus is None:
+        _bus = open_bus()
+        if _bus is None:
+            return None
+    data = []
     try:
-        bus = smbus.SMBus(I2C_BUS)
-        num_bytes = 64
-        data = bus.read_i2c_block_data(SLAVE_ADDR, 0, num_bytes)
-        # Convert list of integers to string and remove trailing nulls
-        sensor_string = ''.join(chr(x) for x in data).split('\x00')[0].strip()
-        return sensor_string
-    except Exception as e:
+        while len(data) < MAX_MESSAGE_LEN:
+            chunk = _bus.read_i2c_block_data(SLAVE_ADDR, len(data), I2C_CHUNK)
+            data += chunk
+            if 0x24 in chunk or 0 in chunk:  # '$' ends the message, nulls pad it
+                break
+    except OSError as e:
         print("I2C communication error:", e)
+        # Reopen the bus on the next poll
+        try:
+            _bus.close()
+        except Exception:
+            pass
+        _bus = None
         return None
+    # Convert list of integers to bytes and remove trailing nulls
+    buf = bytes(data)
+    end = buf.find(0)
+    return (buf[:end] if end >= 0 else buf).strip()
+
+
+# Characters allowed in numeric fields. Keeps the result identical to the
+# sensor_parse extension (no underscores, inf/nan or hex floats).
+_WHITESPACE = b" \t\n\r\x0b\x0c"
+_DECIMAL_CHARS = b"0123456789+-.eE" + _WHITESPACE
+_INTEGER_CHARS = b"0123456789+-" + _WHITESPACE
+_HEX_CHARS = b"0123456789abcdefABCDEFxX+-" + _WHITESPACE
+
+
+def _to_float(value):
+    """Convert a plain decimal field to float, raising ValueError otherwise."""
+    if value.translate(None, _DECIMAL_CHARS):
+        raise ValueError("invalid sensor value: %r" % value)
+    return float(value)
+
 
+def _to_int32(value, base=10):
+    """Convert a plain integer field that fits in 32 bits, raising ValueError otherwise."""
+    if value.translate(None, _HEX_CHARS if base == 16 else _INTEGER_CHARS):
+        raise ValueError("invalid sensor value: %r" % value)
+    result = int(value, base)
+    if not -2 ** 31 <= result < 2 ** 31:
+        raise ValueError("sensor value out of range: %r" % value)
+    return result
 
-def parse_and_validate(sensor_string):
+
+# Field prefix -> (dictionary key, converter)
+SENSOR_FIELDS = {
+    b"T": ("temperature", _to_float),
+    b"P": ("pH", _to_float),
+    b"E": ("EC", _to_float),
+    b"W": ("water_level", _to_float),
+    b"S": ("status", _to_int32),
+}
+
+
+def parse_and_validate(raw):
     """
-    Parses the given sensor string with the expected format:
+    Parses the given raw sensor message (bytes) with the expected format:
       "#T:xx.xx,P:xx.xx,E:xx.xx,W:xx.xx,S:x,CS:XX$"
     and validates it via checksum.
     Returns a dictionary with sensor readings if the parsing is successful.
+    Uses the compiled sensor_parse extension when it is available.
     """
-    if not sensor_string.startswith("#") or not sensor_string.endswith("$"):
+    if parse_fast is not None:
+        return parse_fast(raw)
+    if len(raw) < 2 or raw[0] != 0x23 or raw[-1] != 0x24:  # '#' ... '$'
         return None
 
-    content = sensor_string[1:-1]  # remove the '#' and '$'
-    parts = content.split(',')
-    data = {}
-    cs_from_msg = None
-    message_for_checksum = ""
-
-    for part in parts:
-        if part.startswith("CS:"):
-            cs_from_msg = part[3:]
-        else:
-            message_for_checksum += part + ","
-    if message_for_checksum.endswith(","):
-        message_for_checksum = message_for_checksum[:-1]
-
-    # Calculate checksum (sum of ASCII codes modulo 256)
-    checksum_calc = sum(ord(c) for c in message_for_checksum) % 256
+    # Checksum covers everything between '#' and ",CS:" (sum of ASCII codes modulo 256)
+    k = raw.rfind(b",CS:")
+    if k < 0:
+        print("Checksum missing from message")
+        return None
+    payload = raw[1:k]
+    cs_from_msg = raw[k + 4:-1]
     try:
-        checksum_msg = int(cs_from_msg, 16)
-    except Exception as e:
+        checksum_msg = _to_int32(cs_from_msg, 16)
+    except ValueError as e:
         print("Checksum conversion error:", e)
         return None
+    checksum_calc = sum(payload) & 0xFF
     if checksum_calc != checksum_msg:
-        print("Checksum mismatch:", hex(checksum_calc), "vs", cs_from_msg)
+        print("Checksum mismatch:", hex(checksum_calc), "vs", cs_from_msg.decode('latin-1'))
         return None
 
-    # Parse sensor values into dictionary:
-    for part in parts:
-        if part.startswith("T:"):
-            data["temperature"] = float(part[2:])
-        elif part.startswith("P:"):
-            data["pH"] = float(part[2:])
-        elif part.startswith("E:"):
-            data["EC"] = float(part[2:])
-        elif part.startswith("W:"):
-            data["water_level"] = float(part[2:])
-        elif part.startswith("S:"):
-            data["status"] = int(part[2:])
+    # Parse sensor values into dictionary, dispatching on the field prefix
+    data = {}
+    try:
+        for part in payload.split(b","):
+            field = SENSOR_FIELDS.get(part[:1])
+            if field is not None and part[1:2] == b":":
+                key, convert = field
+                data[key] = convert(part[2:])
+    except ValueError as e:
+        print("Sensor value parse error:", e)
+        return None
     return data
 
 
 # -------------------------------
 # Data Logging Functions
 # -------------------------------
-def log_data(data):
-    """Log sensor data to a SQLite database."""
+DB_PATH = "sensor_data.db"
+LOG_DIR = "logs"               # Full sensor log, one JSONL file per UTC day
+HISTORY_ROWS = 100             # Rows kept in SQLite for /api/history
+HISTORY_CACHE_TTL = 2          # Seconds to reuse a /api/history response (one poll interval)
+DB_FLUSH_ROWS = 50             # Flush buffered rows after this many samples...
+DB_FLUSH_INTERVAL = 10         # ...or after this many seconds, whichever comes first
+
+# Shared SQLite connection, opened once instead of per sample
+_db_conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+_db_conn.execute("PRAGMA journal_mode=WAL")
+_db_conn.execute("PRAGMA synchronous=NORMAL")
+_pending_rows = collections.deque()
+# SQL used by flush_data(), named so the batch write reads as one step
+_INSERT_SQL = "INSERT INTO sensor_data (timestamp, temperature, pH, EC, water_level, status) VALUES (?, ?, ?, ?, ?, ?)"
+_TRIM_SQL = "DELETE FROM sensor_data WHERE id <= (SELECT MAX(id) FROM sensor_data) - ?"
+_flush_lock = threading.Lock()
+_last_flush_time = time.time()
+_log_file = None
+_log_date = None
+_trim_enabled = False          # Set once rows from before the JSONL log have been exported
+
+
+def init_db():
+    """Create the sensor_data table if it does not exist yet."""
+    with _db_conn:
+        _db_conn.execute('''CREATE TABLE IF NOT EXISTS sensor_data (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                            temperature REAL,
+                            pH REAL,
+                            EC REAL,
+                            water_level REAL,
+                            status INTEGER
+                        )''')
+        _db_conn.execute("CREATE INDEX IF NOT EXISTS idx_ts ON sensor_data(timestamp DESC)")
+    migrate_legacy_rows()
+
+
+def migrate_legacy_rows():
+    """
+    One-shot migration for databases created before the JSONL log existed:
+    append every existing row to logs/YYYY-MM-DD.jsonl so trimming SQLite to
+    HISTORY_ROWS does not lose history. Marked done with PRAGMA user_version;
+    trimming stays disabled until it has succeeded.
+    """
+    global _trim_enabled
+    if _db_conn.execute("PRAGMA user_version").fetchone()[0] >= 1:
+        _trim_enabled = True
+        return
+    files = {}
     try:
-        conn = sqlite3.connect("sensor_data.db")
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS sensor_data (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        temperature REAL,
-                        pH REAL,
-                        EC REAL,
-                        water_level REAL,
-                        status INTEGER
-                    )''')
-        c.execute("INSERT INTO sensor_data (temperature, pH, EC, water_level, status) VALUES (?, ?, ?, ?, ?)",
-                  (data.get("temperature"), data.get("pH"), data.get("EC"), data.get("water_level"), data.get("status")))
-        conn.commit()
-        conn.close()
+        rows = _db_conn.execute(
+            "SELECT timestamp, temperature, pH, EC, water_level, status FROM sensor_data ORDER BY id")
+        for row in rows:
+            timestamp = str(row[0])
+            day = timestamp[:10]
+            if day not in files:
+                os.makedirs(LOG_DIR, exist_ok=True)
+                files[day] = open(os.path.join(LOG_DIR, day + ".jsonl"), "ab")
+            files[day].write(orjson.dumps({
+                "temperature": row[1],
+                "pH": row[2],
+                "EC": row[3],
+                "water_level": row[4],
+                "status": row[5],
+                "timestamp": timestamp
+            }) + b"\n")
+        for f in files.values():
+            f.close()
+        _db_conn.execute("PRAGMA user_version = 1")
+        _trim_enabled = True
+        if files:
+            print("Exported existing sensor_data rows to", LOG_DIR)
     except Exception as e:
-        print("SQLite logging error:", e)
+        print("Error exporting existing sensor_data rows, keeping them in SQLite:", e)
+    finally:
+        for f in files.values():
+            f.close()
 
 
-# Initialize InfluxDB client (make sure InfluxDB is running)
-influx_client = InfluxDBClient(host='localhost', port=8086)
-try:
-    influx_client.switch_database('sensor_data')
-except Exception as e:
-    print("Error switching to InfluxDB database:", e)
+init_db()
+
 
+def _get_log_file(today):
+    """Return the open JSONL log file for the given UTC day ("YYYY-MM-DD"), rotating at midnight."""
+    global _log_file, _log_date
+    if today != _log_date:
+        if _log_file is not None:
+            _log_file.close()
+        os.makedirs(LOG_DIR, exist_ok=True)
+        path = os.path.join(LOG_DIR, today + ".jsonl")
+        _log_file = open(path, "ab", buffering=1 << 16)
+        _log_date = today
+    return _log_file
 
-def log_data_influxdb(data):
+
+def flush_data():
     """
-    Log sensor data to InfluxDB.
-    The measurement is named "sensors" with fields for each sensor reading.
+    Write all buffered sensor rows to SQLite in a single transaction and
+    flush the JSONL log. SQLite only keeps the last HISTORY_ROWS records.
     """
-    json_body = [
-        {
-            "measurement": "sensors",
-            "tags": {
-                "host": "raspberry_pi",
-                "sensor": "hydroponics"
-            },
-            "time": datetime.datetime.utcnow().isoformat(),
-            "fields": {
-                "temperature": float(data.get("temperature", 0)),
-                "pH": float(data.get("pH", 0)),
-                "EC": float(data.get("EC", 0)),
-                "water_level": float(data.get("water_level", 0)),
-                "status": int(data.get("status", 0))
-            }
-        }
-    ]
+    global _last_flush_time
+    with _flush_lock:
+        rows = []
+        while _pending_rows:
+            rows.append(_pending_rows.popleft())
+        _last_flush_time = time.time()
+        if not rows:
+            return
+        try:
+            if _log_file is not None:
+                _log_file.flush()
+        except Exception as e:
+            print("Log file error:", e)
+        try:
+            with _db_conn:
+                _db_conn.executemany(_INSERT_SQL, rows)
+                if _trim_enabled:
+                    _db_conn.execute(_TRIM_SQL, (HISTORY_ROWS,))
+        except Exception as e:
+            print("SQLite logging error:", e)
+
+
+def log_data(data, when=None):
+    """
+    Append sensor data to the daily JSONL log and buffer it for SQLite.
+    `when` is the Unix time the sample was read (defaults to now).
+    Rows are written in batches by flush_data() to avoid one commit (and fsync) per sample.
+    """
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(when))
     try:
-        influx_client.write_points(json_body)
-        print("InfluxDB logging successful.")
+        _get_log_file(timestamp[:10]).write(orjson.dumps(dict(data, timestamp=timestamp)) + b"\n")
+    except Exception as e:
+        print("Log file error:", e)
+    _pending_rows.append((timestamp, data.get("temperature"), data.get("pH"), data.get("EC"),
+                          data.get("water_level"), data.get("status")))
+    if len(_pending_rows) >= DB_FLUSH_ROWS or time.time() - _last_flush_time >= DB_FLUSH_INTERVAL:
+        flush_data()
+
+
+# InfluxDB 1.x HTTP write endpoint (make sure InfluxDB is running)
+INFLUX_WRITE_URL = "http://localhost:8086/write"
+INFLUX_DB = "sensor_data"
+INFLUX_BATCH_SIZE = 30         # Write buffered points after this many samples...
+INFLUX_BATCH_INTERVAL = 60     # ...or after this many seconds, whichever comes first
+_influx_http = requests.Session()
+_influx_buf = []               # Line-protocol lines waiting to be written
+_influx_lock = threading.Lock()
+_influx_last_write = time.time()
+
+
+def flush_influxdb():
+    """Write all buffered points to InfluxDB in one line-protocol request."""
+    global _influx_buf, _influx_last_write
+    with _influx_lock:
+        lines, _influx_buf = _influx_buf, []
+        _influx_last_write = time.time()
+    if not lines:
+        return
+    try:
+        response = _influx_http.post(INFLUX_WRITE_URL, params={"db": INFLUX_DB, "precision": "s"},
+                                     data="\n".join(lines).encode(),
+                                     headers={"Content-Type": "text/plain; charset=utf-8"}, timeout=10)
+        if response.status_code == 204:
+            print("InfluxDB logging successful (%d points)." % len(lines))
+        else:
+            print("Error logging to InfluxDB, status code:", response.status_code, response.text)
     except Exception as e:
         print("Error logging to InfluxDB:", e)
 
 
+def log_data_influxdb(data, when=None):
+    """
+    Buffer sensor data for InfluxDB.
+    The measurement is named "sensors" with fields for each sensor reading.
+    `when` is the Unix time the sample was read (defaults to now).
+    Points are sent in batches by flush_influxdb().
+    """
+    if when is None:
+        when = time.time()
+    line = ("sensors,host=raspberry_pi,sensor=hydroponics "
+            "temperature=%r,pH=%r,EC=%r,water_level=%r,status=%di %d" % (
+                float(data.get("temperature", 0)),
+                float(data.get("pH", 0)),
+                float(data.get("EC", 0)),
+                float(data.get("water_level", 0)),
+                int(data.get("status", 0)),
+                int(when)))
+    with _influx_lock:
+        _influx_buf.append(line)
+    if len(_influx_buf) >= INFLUX_BATCH_SIZE or time.time() - _influx_last_write >= INFLUX_BATCH_INTERVAL:
+        flush_influxdb()
+
+
 # -------------------------------
 # Alerting Functions
 # -------------------------------
+# Shared HTTP session so Slack/Pushover alerts reuse kept-alive TLS connections
+_http = requests.Session()
+_http.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8,
+                                    max_retries=Retry(total=2, backoff_factor=0.3)))
+
+
+# Email (SMTP) configuration -- update with your SMTP server and credentials
+SMTP_SERVER = 'smtp.example.com'
+SMTP_PORT = 587
+SMTP_USERNAME = "your_email_username"
+SMTP_PASSWORD = "your_email_password"
+EMAIL_SENDER = "your_email@example.com"
+EMAIL_RECIPIENT = "alert_recipient@example.com"
+
+# Twilio configuration
+TWILIO_ACCOUNT_SID = 'your_twilio_account_sid'
+TWILIO_AUTH_TOKEN = 'your_twilio_auth_token'
+TWILIO_FROM = '+1234567890'    # Your Twilio number
+TWILIO_TO = '+0987654321'      # Recipient's phone number
+
+
+class SMTPConnection:
+    """
+    A persistent, logged-in SMTP connection.
+    Connects lazily and reconnects once if the server has dropped the session,
+    either by disconnecting or by answering 421 after an idle timeout.
+    """
+
+    def __init__(self, host, port, username, password):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.smtp = None
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        self.close()
+        smtp = smtplib.SMTP(self.host, self.port, timeout=ALERT_TIMEOUT)
+        try:
+            smtp.starttls()
+            smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self.smtp = smtp
+
+    def close(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except Exception:
+                pass
+            self.smtp = None
+
+    def sendmail(self, sender, recipients, message):
+        with self.lock:
+            if self.smtp is None:
+                self._connect()
+            try:
+                self.smtp.sendmail(sender, recipients, message)
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException) as e:
+                # 421: the server is closing the (idle) session
+                if isinstance(e, smtplib.SMTPResponseException) and e.smtp_code != 421:
+                    raise
+                self._connect()
+                self.smtp.sendmail(sender, recipients, message)
+
+
+_smtp = SMTPConnection(SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD)
+_twilio = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN,
+                 http_client=TwilioHttpClient(timeout=ALERT_TIMEOUT))
+
+
 def send_email_alert(data):
     """Send an email alert if a sensor error is detected."""
-    sender = "your_email@example.com"
-    recipient = "alert_recipient@example.com"
     subject = "Sensor Alert: Issue Detected"
     body = f"Alert! A sensor error has been detected:\n\n{data}"
     msg = MIMEText(body)
     msg['Subject'] = subject
-    msg['From'] = sender
-    msg['To'] = recipient
+    msg['From'] = EMAIL_SENDER
+    msg['To'] = EMAIL_RECIPIENT
 
     try:
-        smtp_server = 'smtp.example.com'  # Update with your SMTP server
-        smtp_port = 587
-        with smtplib.SMTP(smtp_server, smtp_port) as s:
-            s.starttls()
-            s.login("your_email_username", "your_email_password")
-            s.sendmail(sender, [recipient], msg.as_string())
+        _smtp.sendmail(EMAIL_SENDER, [EMAIL_RECIPIENT], msg.as_string())
         print("Alert email sent.")
     except Exception as e:
         print("Failed to send email alert:", e)
@@ -183,15 +479,12 @@ def send_email_alert(data):
 
 def send_sms_alert(data):
     """Send an SMS alert via Twilio if a sensor error is detected."""
-    account_sid = 'your_twilio_account_sid'
-    auth_token = 'your_twilio_auth_token'
-    client = Client(account_sid, auth_token)
     body = f"Sensor Alert: Error detected! Data: {data}"
     try:
-        message = client.messages.create(
+        message = _twilio.messages.create(
             body=body,
-            from_='+1234567890',  # Your Twilio number
-            to='+0987654321'      # Recipient's phone number
+            from_=TWILIO_FROM,
+            to=TWILIO_TO
         )
         print("SMS alert sent. SID:", message.sid)
     except Exception as e:
@@ -203,7 +496,7 @@ def send_slack_alert(data):
     webhook_url = 'https://hooks.slack.com/services/your/slack/webhook'
     payload = {"text": f"Sensor Alert: Error detected!\nData: {data}"}
     try:
-        response = requests.post(webhook_url, json=payload)
+        response = _http.post(webhook_url, json=payload, timeout=ALERT_TIMEOUT)
         if response.status_code == 200:
             print("Slack alert sent successfully.")
         else:
@@ -222,7 +515,7 @@ def send_push_notification(data):
         "title": "Sensor Alert!"
     }
     try:
-        response = requests.post(url, data=payload)
+        response = _http.post(url, data=payload, timeout=ALERT_TIMEOUT)
         if response.status_code == 200:
             print("Push notification sent successfully.")
         else:
@@ -231,35 +524,100 @@ def send_push_notification(data):
         print("Exception sending push notification:", e)
 
 
+ALERT_SENDERS = (send_email_alert, send_sms_alert, send_slack_alert, send_push_notification)
+
+# Thread pool that sends alerts concurrently, off the polling thread
+_alert_pool = concurrent.futures.ThreadPoolExecutor(max_workers=len(ALERT_SENDERS), thread_name_prefix="alert")
+
+
+def send_alerts(data):
+    """Submit every alert sender to the alert pool and return immediately."""
+    for sender in ALERT_SENDERS:
+        _alert_pool.submit(sender, data)
+
+
 # -------------------------------
-# Sensor Polling Thread
+# Sensor Polling and Logging Threads
 # -------------------------------
+# Samples handed from the polling thread to the logging thread as (Unix time, data)
+_samples = collections.deque(maxlen=1024)
+_samples_ready = threading.Condition()
+
+
 def sensor_polling_thread():
-    global global_sensor_data, last_alert_time
+    """Producer: read and parse the sensor, then queue the sample for logging."""
+    global global_sensor_data, global_sensor_json, last_alert_time, _last_alerted_status
     while True:
-        sensor_str = read_sensor_data()
-        if sensor_str:
-            parsed = parse_and_validate(sensor_str)
+        sensor_bytes = read_sensor_data()
+        if sensor_bytes:
+            parsed = parse_and_validate(sensor_bytes)
             if parsed:
                 global_sensor_data = parsed
-                # Log data to SQLite and InfluxDB
-                log_data(parsed)
-                log_data_influxdb(parsed)
-
-                # If an error is detected (non-zero status), send alerts (with rate-limiting)
-                if parsed.get("status", 0) != 0:
+                global_sensor_json = orjson.dumps(parsed)
+                with _samples_ready:
+                    _samples.append((time.time(), parsed))
+                    _samples_ready.notify()
+
+                # If an error status has not been alerted yet, send alerts (with rate-limiting).
+                # A rate-limited error stays pending until the window allows it.
+                status = parsed.get("status", 0)
+                if status == 0:
+                    _last_alerted_status = 0
+                elif status != _last_alerted_status:
                     current_time = time.time()
                     if current_time - last_alert_time > ALERT_RATE_LIMIT:
-                        send_email_alert(parsed)
-                        send_sms_alert(parsed)
-                        send_slack_alert(parsed)
-                        send_push_notification(parsed)
+                        send_alerts(parsed)
                         last_alert_time = current_time
+                        _last_alerted_status = status
         else:
             print("No sensor data received.")
         time.sleep(2)  # Poll every 2 seconds
 
 
+def _log_samples(batch):
+    for when, data in batch:
+        log_data(data, when)
+        log_data_influxdb(data, when)
+
+
+def _flush_due():
+    """Flush the SQLite/JSONL and InfluxDB buffers whose flush interval has passed."""
+    now = time.time()
+    if now - _last_flush_time >= DB_FLUSH_INTERVAL:
+        flush_data()
+    if now - _influx_last_write >= INFLUX_BATCH_INTERVAL:
+        flush_influxdb()
+
+
+def sensor_logging_thread():
+    """
+    Consumer: drain queued samples and log them to SQLite and InfluxDB.
+    Wakes up at least once per flush interval, so buffered data is still
+    written when the sensor stops sending.
+    """
+    while True:
+        with _samples_ready:
+            if not _samples:
+                _samples_ready.wait(timeout=min(DB_FLUSH_INTERVAL, INFLUX_BATCH_INTERVAL))
+            batch = list(_samples)
+            _samples.clear()
+        _log_samples(batch)
+        _flush_due()
+
+
+def flush_all():
+    """Log any queued samples and write every buffer out. Runs at shutdown."""
+    with _samples_ready:
+        batch = list(_samples)
+        _samples.clear()
+    _log_samples(batch)
+    flush_data()
+    flush_influxdb()
+
+
+atexit.register(flush_all)
+
+
 # -------------------------------
 # Flask Routes
 # -------------------------------
@@ -271,22 +629,29 @@ def dashboard():
 
 @app.route('/api/data')
 def api_data():
-    """Return the latest sensor data as JSON."""
-    return jsonify(global_sensor_data)
-
-
-@app.route('/api/history')
-def api_history():
-    """Return the most recent 100 sensor records from SQLite as JSON."""
-    try:
-        conn = sqlite3.connect("sensor_data.db")
-        c = conn.cursor()
-        c.execute("SELECT timestamp, temperature, pH, EC, water_level, status FROM sensor_data ORDER BY timestamp DESC LIMIT 100")
-        rows = c.fetchall()
-        conn.close()
-        data = []
-        for row in rows:
-            rec = {
+    """Return the latest sensor data as JSON (serialized once per reading)."""
+    return Response(global_sensor_json, mimetype='application/json')
+
+
+# Read-only connection for the API, so readers never take the writer's connection
+_db_ro_conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False)
+_history_lock = threading.Lock()
+_history_cache = (0, b"[]")    # (expiry time, serialized JSON)
+
+
+def get_history_json():
+    """Return the most recent sensor records as JSON bytes, cached for HISTORY_CACHE_TTL seconds."""
+    global _history_cache
+    with _history_lock:
+        expires, body = _history_cache
+        now = time.time()
+        if now < expires:
+            return body
+        rows = _db_ro_conn.execute(
+            "SELECT timestamp, temperature, pH, EC, water_level, status FROM sensor_data ORDER BY timestamp DESC LIMIT ?",
+            (HISTORY_ROWS,)).fetchall()
+        body = orjson.dumps([
+            {
                 "timestamp": row[0],
                 "temperature": row[1],
                 "pH": row[2],
@@ -294,8 +659,17 @@ def api_history():
                 "water_level": row[4],
                 "status": row[5]
             }
-            data.append(rec)
-        return jsonify(data)
+            for row in rows
+        ])
+        _history_cache = (now + HISTORY_CACHE_TTL, body)
+        return body
+
+
+@app.route('/api/history')
+def api_history():
+    """Return the most recent 100 sensor records from SQLite as JSON."""
+    try:
+        return Response(get_history_json(), mimetype='application/json')
     except Exception as e:
         print("Error retrieving historical data:", e)
         return jsonify([])
@@ -307,12 +681,28 @@ def historical_dashboard():
     return render_template("historical.html")
 
 
+# -------------------------------
+# Background Threads
+# -------------------------------
+_threads_started = False
+_threads_lock = threading.Lock()
+
+
+def start_background_threads():
+    """Start the sensor polling and logging threads (once per process)."""
+    global _threads_started
+    with _threads_lock:
+        if _threads_started:
+            return
+        threading.Thread(target=sensor_polling_thread, daemon=True).start()
+        threading.Thread(target=sensor_logging_thread, daemon=True).start()
+        _threads_started = True
+
+
 # -------------------------------
 # Main Entry Point
 # -------------------------------
 if __name__ == '__main__':
-    # Start sensor polling in a background thread
-    sensor_thread = threading.Thread(target=sensor_polling_thread, daemon=True)
-    sensor_thread.start()
-    # Start the Flask app
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Development server; in production run wsgi.py under gunicorn (see Dockerfile)
+    start_background_threads()
+    app.run(host='0.0.0.0', port=5000, threaded=True)
@@ -0,0 +1,8 @@
+# gunicorn.conf.py
+# Loaded automatically by gunicorn from the working directory.
+
+
+def worker_exit(server, worker):
+    """Write buffered sensor data before the worker process exits."""
+    from app import flush_all
+    flush_all()
@@ -0,0 +1,161 @@
+# sensor_parse.pyx
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+C implementation of the sensor message parser used by app.parse_and_validate.
+
+Build in place with:  cythonize -i sensor_parse.pyx
+app.py falls back to the pure-Python parser when this module is not built.
+"""
+from libc.stdlib cimport strtod, strtoll
+
+cdef extern from "ctype.h":
+    int isspace(int c) nogil
+
+cdef enum:
+    DECIMAL = 0   # float: digits, sign, '.', exponent
+    INTEGER = 1   # base-10 int: digits, sign
+    HEX = 2       # base-16 int: hex digits, sign, "0x" prefix
+
+cdef enum:
+    HAS_T = 1
+    HAS_P = 2
+    HAS_E = 4
+    HAS_W = 8
+    HAS_S = 16
+
+
+cdef struct SensorRec:
+    double temperature
+    double pH
+    double EC
+    double water_level
+    long status
+    int flags
+
+
+cdef bint _valid_chars(const unsigned char* buf, Py_ssize_t start, Py_ssize_t end, int kind) noexcept nogil:
+    # Only plain numbers are accepted, by both this parser and app.parse_and_validate.
+    # This keeps strtod/strtoll extensions (hex floats, "nan(...)") and Python-only
+    # syntax (underscores) out of the comparison.
+    cdef unsigned char c
+    cdef Py_ssize_t i
+    for i in range(start, end):
+        c = buf[i]
+        if (b'0' <= c <= b'9') or c == b'+' or c == b'-' or c == b' ' or (9 <= c <= 13):
+            continue
+        if kind == DECIMAL and (c == b'.' or c == b'e' or c == b'E'):
+            continue
+        if kind == HEX and ((b'a' <= c <= b'f') or (b'A' <= c <= b'F') or c == b'x' or c == b'X'):
+            continue
+        return False
+    return True
+
+
+cdef bint _at_end(const char* p, const unsigned char* end) noexcept nogil:
+    # Like Python's float()/int(), allow trailing whitespace after the number
+    while p < <const char*>end and isspace(<unsigned char>p[0]):
+        p += 1
+    return p == <const char*>end
+
+
+cdef bint _read_double(const unsigned char* buf, Py_ssize_t start, Py_ssize_t end, double* out) noexcept nogil:
+    cdef char* endp
+    if end <= start or not _valid_chars(buf, start, end, DECIMAL):
+        return False
+    # Overflow/underflow give +-inf/0.0 here, the same as Python's float()
+    out[0] = strtod(<const char*>(buf + start), &endp)
+    return endp != <const char*>(buf + start) and _at_end(endp, buf + end)
+
+
+cdef bint _read_int32(const unsigned char* buf, Py_ssize_t start, Py_ssize_t end, int kind, long* out) noexcept nogil:
+    # Integers must fit in 32 bits. Parsing into long long (at least 64 bits) means
+    # an overflowing value is clamped to LLONG_MIN/LLONG_MAX, which the bounds check
+    # rejects, on every platform whatever the size of long.
+    cdef char* endp
+    cdef long long value
+    if end <= start or not _valid_chars(buf, start, end, kind):
+        return False
+    value = strtoll(<const char*>(buf + start), &endp, 16 if kind == HEX else 10)
+    if value < -2147483648 or value > 2147483647:
+        return False
+    out[0] = <long>value
+    return endp != <const char*>(buf + start) and _at_end(endp, buf + end)
+
+
+cdef bint _parse(const unsigned char* buf, Py_ssize_t n, SensorRec* out) noexcept nogil:
+    """
+    Scan "#T:xx.xx,P:xx.xx,E:xx.xx,W:xx.xx,S:x,CS:XX$" once, filling `out`.
+    Returns True if the message is well formed and the checksum matches.
+    """
+    cdef Py_ssize_t start, end, i
+    cdef Py_ssize_t cs_start = -1, cs_field = 0, cs_end = 0
+    cdef unsigned char key
+    cdef unsigned int total = 0
+    cdef long cs
+    cdef bint ok
+
+    if n < 2 or buf[0] != b'#' or buf[n - 1] != b'$':
+        return False
+    out.flags = 0
+
+    start = 1
+    while start <= n - 1:
+        end = start
+        while end < n - 1 and buf[end] != b',':
+            end += 1
+        if end - start >= 3 and buf[start] == b'C' and buf[start + 1] == b'S' and buf[start + 2] == b':':
+            cs_start = start - 1  # the comma in front of "CS:"
+            cs_field = start + 3
+            cs_end = end
+        elif end - start >= 2 and buf[start + 1] == b':':
+            key = buf[start]
+            ok = True
+            if key == b'T':
+                ok = _read_double(buf, start + 2, end, &out.temperature)
+                out.flags |= HAS_T
+            elif key == b'P':
+                ok = _read_double(buf, start + 2, end, &out.pH)
+                out.flags |= HAS_P
+            elif key == b'E':
+                ok = _read_double(buf, start + 2, end, &out.EC)
+                out.flags |= HAS_E
+            elif key == b'W':
+                ok = _read_double(buf, start + 2, end, &out.water_level)
+                out.flags |= HAS_W
+            elif key == b'S':
+                ok = _read_int32(buf, start + 2, end, INTEGER, &out.status)
+                out.flags |= HAS_S
+            if not ok:
+                return False
+        start = end + 1
+
+    # ",CS:" must be the last field
+    if cs_start < 1 or cs_end != n - 1 or not _read_int32(buf, cs_field, cs_end, HEX, &cs):
+        return False
+    for i in range(1, cs_start):
+        total += buf[i]
+    return (total & 0xFF) == cs
+
+
+def parse(bytes raw):
+    """Parse and validate a raw sensor message. Returns a dict of readings or None."""
+    cdef SensorRec rec
+    cdef const unsigned char* buf = raw
+    cdef Py_ssize_t n = len(raw)
+    cdef bint ok
+    with nogil:
+        ok = _parse(buf, n, &rec)
+    if not ok:
+        return None
+    data = {}
+    if rec.flags & HAS_T:
+        data["temperature"] = rec.temperature
+    if rec.flags & HAS_P:
+        data["pH"] = rec.pH
+    if rec.flags & HAS_E:
+        data["EC"] = rec.EC
+    if rec.flags & HAS_W:
+        data["water_level"] = rec.water_level
+    if rec.flags & HAS_S:
+        data["status"] = rec.status
+    return data
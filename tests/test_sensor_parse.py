@@ -0,0 +1,93 @@
+# tests/test_sensor_parse.py
+"""
+Parity check between the compiled sensor_parse extension and the pure-Python
+parser in app.parse_and_validate. Skipped when the extension is not built
+(cythonize -i sensor_parse.pyx).
+"""
+import math
+import random
+
+import pytest
+
+import app
+
+sensor_parse = pytest.importorskip("sensor_parse")
+
+# Values where libc strtod/strtol and Python's float()/int() have historically disagreed
+TRICKY_VALUES = [
+    "0x1A", "nan(1)", "1_0", "inf", "nan", "-inf", "Infinity", "1e999", "-1e-999", "-0",
+    " 1 ", "1e", ".", " ", "", "0x", "0x_1f", "1__0", "+1", "--1", "1.5e+3", "\t2\n",
+    "\x1c1", "1.", "  .5", "1 2", "e5", "0X1F", "1f", "-0x1f",
+    "2147483647", "2147483648", "-2147483648", "-2147483649", "4294967296",
+    "9999999999", "9223372036854775808", "99999999999999999999",
+]
+
+
+def frame(body, checksum=None):
+    """Wrap a message body as "#<body>,CS:XX$" with a valid (or the given) checksum."""
+    raw = body.encode("utf-8")
+    if checksum is None:
+        checksum = "%02X" % (sum(raw) % 256)
+    return b"#" + raw + b",CS:" + checksum.encode("utf-8") + b"$"
+
+
+def random_message(rng):
+    values = [rng.choice(TRICKY_VALUES) if rng.random() < 0.5 else "%.2f" % rng.uniform(-10, 50)
+              for _ in range(4)]
+    status = rng.choice(TRICKY_VALUES) if rng.random() < 0.5 else str(rng.randint(0, 3))
+    body = "T:%s,P:%s,E:%s,W:%s,S:%s" % (values[0], values[1], values[2], values[3], status)
+    cs = sum(body.encode("utf-8")) % 256
+    r = rng.random()
+    if r < 0.3:
+        checksum = "%02X" % cs
+    elif r < 0.5:
+        checksum = "0x%02x" % cs
+    elif r < 0.6:
+        checksum = " %x " % cs
+    elif r < 0.7:
+        checksum = "%X" % (cs + 256 * rng.randint(1, 10 ** 12))
+    else:
+        checksum = rng.choice(TRICKY_VALUES)
+    return frame(body, checksum)
+
+
+def same(a, b):
+    if a is None or b is None:
+        return a is b
+    return a.keys() == b.keys() and all(
+        x == y or (isinstance(x, float) and math.isnan(x) and math.isnan(y))
+        for x, y in zip(a.values(), (b[k] for k in a)))
+
+
+@pytest.fixture
+def parse_python(monkeypatch):
+    monkeypatch.setattr(app, "parse_fast", None)
+    return app.parse_and_validate
+
+
+def test_valid_message(parse_python):
+    raw = frame("T:23.40,P:6.10,E:1.20,W:80.00,S:0")
+    expected = {"temperature": 23.4, "pH": 6.1, "EC": 1.2, "water_level": 80.0, "status": 0}
+    assert parse_python(raw) == expected
+    assert sensor_parse.parse(raw) == expected
+
+
+@pytest.mark.parametrize("value", TRICKY_VALUES)
+def test_tricky_values_agree(parse_python, value):
+    for body in ("T:%s,P:1,E:1,W:1,S:0" % value, "T:1,P:1,E:1,W:1,S:%s" % value):
+        raw = frame(body)
+        assert same(parse_python(raw), sensor_parse.parse(raw)), raw
+
+
+@pytest.mark.parametrize("value", ["9999999999", "2147483648", "-2147483649", "99999999999999999999"])
+def test_out_of_range_status_rejected(parse_python, value):
+    raw = frame("T:1,P:1,E:1,W:1,S:%s" % value)
+    assert parse_python(raw) is None
+    assert sensor_parse.parse(raw) is None
+
+
+def test_random_messages_agree(parse_python):
+    rng = random.Random(1234)
+    for _ in range(20000):
+        raw = random_message(rng)
+        assert same(parse_python(raw), sensor_parse.parse(raw)), raw
@@ -0,0 +1,12 @@
+# wsgi.py
+"""
+WSGI entry point for production servers, e.g.:
+  gunicorn -w 1 -k gthread --threads 8 -b 0.0.0.0:5000 wsgi:app
+
+Use a single worker process: each worker starts its own sensor polling
+thread, and only one process should own the I²C bus and the SQLite writer.
+gunicorn.conf.py flushes buffered sensor data when the worker exits.
+"""
+from app import app, start_background_threads
+
+start_background_threads()